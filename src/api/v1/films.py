@@ -1,9 +1,11 @@
 from http import HTTPStatus
 from typing import Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from src.api.v1.pagination import check_result_window
+from src.api.v1.responses import EMPTY_LIST, etag_response
 from src.services.film import (FilmService, FilmsService, SearchService, get_film_service, get_films_service,
                                search_film_service)
 
@@ -28,53 +30,54 @@ class Films(BaseModel):
 
 
 @router.get('/search',
-            response_model=List[Films],
+            response_model=None,
+            responses={HTTPStatus.OK.value: {'model': List[Films]}},
             summary='Поиск по фильмам',
             description='Полнотекстовый поиск по фильмам по описанию и названию',
             response_description='Список кинопроизведений с краткой информацией о них',
             tags=['Полнотекстовый поиск'],
             )
 async def film_search(
-        query: str,
-        page_size: int = 50,
-        page_number: int = 1,
-        film_search: SearchService = Depends(search_film_service)) -> List[Films]:
+        query: str = Query(..., min_length=1, max_length=256),
+        page_size: int = Query(50, ge=1, le=100),
+        page_number: int = Query(1, ge=1, le=1000),
+        film_search: SearchService = Depends(search_film_service)) -> Response:
+    check_result_window(page_size, page_number)
     films = await film_search.search_film(query, page_size, page_number)
-    if not films:
-        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='films not found')
-    return [Films(id=film.id, title=film.title, imdb_rating=film.imdb_rating) for film in films]
+    return Response(content=films or EMPTY_LIST, media_type='application/json')
 
 
 @router.get('/{film_id}',
-            response_model=FilmDetail,
+            response_model=None,
+            responses={HTTPStatus.OK.value: {'model': FilmDetail}},
             summary='Полная информация по фильму',
             description='Получение информации о фильме',
             response_description='Полная информация по кинопроизведению',
             tags=['Фильмы'],
             )
 async def film_details(
+        request: Request,
         film_id: str,
-        film_detail: FilmService = Depends(get_film_service)) -> FilmDetail:
+        film_detail: FilmService = Depends(get_film_service)) -> Response:
     film = await film_detail.get_by_id(film_id)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='film not found')
-    return FilmDetail(id=film.id, title=film.title, imdb_rating=film.imdb_rating, description=film.description,
-                      genre=film.genre, director=film.director, actors=film.actors, writers=film.writers)
+    return etag_response(request, film)
 
 
 @router.get('',
-            response_model=List[Films],
+            response_model=None,
+            responses={HTTPStatus.OK.value: {'model': List[Films]}},
             summary='Главная страница',
             description='Получение списка кинопроизведении с возможностью фильтрации по жанру',
             response_description='Список кинопроизведений с краткой информацией о них',
             tags=['Фильмы'],
             )
 async def film_list(
-        page_size: int = 50,
-        page_number: int = 1,
+        page_size: int = Query(50, ge=1, le=100),
+        page_number: int = Query(1, ge=1, le=1000),
         genre_name: str | None = None,
-        film_list: FilmsService = Depends(get_films_service)) -> List[Films]:
+        film_list: FilmsService = Depends(get_films_service)) -> Response:
+    check_result_window(page_size, page_number)
     films = await film_list.get_films(page_size, page_number, genre_name)
-    if not films:
-        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='films over')
-    return [Films(id=film.id, title=film.title, imdb_rating=film.imdb_rating) for film in films]
+    return Response(content=films or EMPTY_LIST, media_type='application/json')
@@ -1,9 +1,11 @@
 from http import HTTPStatus
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from src.api.v1.pagination import check_result_window
+from src.api.v1.responses import EMPTY_LIST, etag_response
 from src.services.genre import GenreService, GenresService, get_genre_service, get_genres_service
 
 router = APIRouter()
@@ -16,33 +18,35 @@ class Genre(BaseModel):
 
 
 @router.get('/{genres_id}',
-            response_model=Genre,
+            response_model=None,
+            responses={HTTPStatus.OK.value: {'model': Genre}},
             summary='Данные по конкретному жанру',
             description='Получение информации о жанре',
             response_description='Полная информация о жанре',
             tags=['Жанры'],
             )
 async def genre_details(
+        request: Request,
         genres_id: str,
-        genre_detail: GenreService = Depends(get_genre_service)) -> Genre:
+        genre_detail: GenreService = Depends(get_genre_service)) -> Response:
     genre = await genre_detail.get_by_id(genres_id)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='genre not found')
-    return Genre(id=genre.id, name=genre.name)
+    return etag_response(request, genre)
 
 
 @router.get('',
-            response_model=List[Genre],
+            response_model=None,
+            responses={HTTPStatus.OK.value: {'model': List[Genre]}},
             summary='Список жанров',
             description='Получение списка жанров',
             response_description='Список жанров с краткой информацией о них',
             tags=['Жанры'],
             )
 async def genre_list(
-        page_size: int = 50,
-        page_number: int = 1,
-        genre_list: GenresService = Depends(get_genres_service)) -> List[Genre]:
+        page_size: int = Query(50, ge=1, le=100),
+        page_number: int = Query(1, ge=1, le=1000),
+        genre_list: GenresService = Depends(get_genres_service)) -> Response:
+    check_result_window(page_size, page_number)
     genres = await genre_list.get_genres(page_size, page_number)
-    if not genres:
-        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='genres over')
-    return [Genre(id=genre.id, name=genre.name, description=genre.description) for genre in genres]
+    return Response(content=genres or EMPTY_LIST, media_type='application/json')
@@ -0,0 +1,14 @@
+from http import HTTPStatus
+
+from fastapi import HTTPException
+
+from src.core import config
+
+
+def check_result_window(page_size: int, page_number: int):
+    """Reject pages that Elasticsearch would refuse to return because they lie past index.max_result_window."""
+    if page_size * page_number > config.ELASTIC_MAX_RESULT_WINDOW:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=f'page_size * page_number must not exceed {config.ELASTIC_MAX_RESULT_WINDOW}',
+        )
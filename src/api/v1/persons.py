@@ -1,10 +1,12 @@
 from http import HTTPStatus
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
 from src.api.v1.films import Films
+from src.api.v1.pagination import check_result_window
+from src.api.v1.responses import EMPTY_LIST, etag_response
 from src.services.person import (PersonService, SearchPersonFilmService, SearchPersonService, get_person_service,
                                  search_person_films_service, search_person_service)
 
@@ -23,57 +25,55 @@ class Person(BaseModel):
 
 
 @router.get('/search',
-            response_model=List[Person],
+            response_model=None,
+            responses={HTTPStatus.OK.value: {'model': List[Person]}},
             summary='Поиск по персонам',
             description='Полнотекстовый поиск по персонам по полному имени',
             response_description='Список персон с краткой информацией о них',
             tags=['Полнотекстовый поиск'],
             )
 async def person_search(
-        query: str,
-        page_size: int = 50,
-        page_number: int = 1,
-        person_search: SearchPersonService = Depends(search_person_service)) -> List[Person]:
-    persons = await person_search.search_person(query, page_size, page_number)
-    if not persons:
-        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='persons not found')
-    return [
-        Person(
-            id=person.id,
-            full_name=person.full_name,
-            films=[Film(id=film['id'], roles=film['roles']) for film in person.films],
-        ) for person in persons]
+        query: str = Query(..., min_length=1, max_length=256),
+        page_size: int = Query(50, ge=1, le=100),
+        page_number: int = Query(1, ge=1, le=1000),
+        person_search: SearchPersonService = Depends(search_person_service)) -> Response:
+    check_result_window(page_size, page_number)
+    persons = await person_search.search_persons(query, page_size, page_number)
+    return Response(content=persons or EMPTY_LIST, media_type='application/json')
 
 
 @router.get('/{person_id}',
-            response_model=Person,
+            response_model=None,
+            responses={HTTPStatus.OK.value: {'model': Person}},
             summary='Данные по персоне',
             description='Получение информации о персоне',
             response_description='Полная информация по персоне',
             tags=['Персоны'],
             )
 async def person_details(
+        request: Request,
         person_id: str,
-        person_detail: PersonService = Depends(get_person_service)) -> Person:
+        person_detail: PersonService = Depends(get_person_service)) -> Response:
     person = await person_detail.get_by_id(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='person not found')
-    return Person(id=person.id, full_name=person.full_name, films=person.films)
+    return etag_response(request, person)
 
 
 @router.get('/{person_id}/film',
-            response_model=List[Films],
+            response_model=None,
+            responses={HTTPStatus.OK.value: {'model': List[Films]}},
             summary='Фильмы по персоне',
             description='Поиск фильма по персоне',
             response_description='Список фильмов, в которых персона была актером с краткой информацией о них',
             tags=['Персоны'],
             )
 async def person_film(
+        request: Request,
         person_id: str,
-        page_size: int = 50,
-        page_number: int = 1,
-        person_film: SearchPersonFilmService = Depends(search_person_films_service)) -> List[Films]:
+        page_size: int = Query(50, ge=1, le=100),
+        page_number: int = Query(1, ge=1, le=1000),
+        person_film: SearchPersonFilmService = Depends(search_person_films_service)) -> Response:
+    check_result_window(page_size, page_number)
     films = await person_film.search_film(person_id, page_size, page_number)
-    if not films:
-        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='films not found')
-    return [Films(id=film.id, title=film.title, imdb_rating=film.imdb_rating) for film in films]
+    return etag_response(request, films or EMPTY_LIST)
@@ -0,0 +1,21 @@
+from http import HTTPStatus
+
+import xxhash
+from fastapi import Request, Response
+
+CACHE_CONTROL = 'public, max-age=60'
+EMPTY_LIST = b'[]'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    return any(tag.strip().removeprefix('W/') in (etag, '*') for tag in if_none_match.split(','))
+
+
+def etag_response(request: Request, body: bytes) -> Response:
+    """Return a JSON body with an ETag, or an empty 304 response if the client already has this body."""
+    etag = f'"{xxhash.xxh3_64_hexdigest(body)}"'
+    headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
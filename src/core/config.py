@@ -1,7 +1,7 @@
 import os
 from logging import config as logging_config
 
-from pydantic import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from src.core.logger import LOGGING
 
@@ -14,11 +14,15 @@ class Settings(BaseSettings):
     ELASTIC_SCHEME_MOVIES: str = 'movies'
     ELASTIC_SCHEME_GENRES: str = 'genres'
     ELASTIC_SCHEME_PERSONS: str = 'persons'
+    ELASTIC_MAX_CONNECTIONS: int = 64
+    ELASTIC_TIMEOUT: int = 2
+    ELASTIC_MAX_RESULT_WINDOW: int = 10_000
     REDIS_HOST: str = '127.0.0.1'
     REDIS_PORT: int = 6379
+    REDIS_MAX_CONNECTIONS: int = 64
+    REDIS_POOL_TIMEOUT: int = 5
 
-    class Config:
-        env_file = './src/core/.env'
+    model_config = SettingsConfigDict(env_file='./src/core/.env')
 
 
 settings = Settings()
@@ -29,6 +33,8 @@ logging_config.dictConfig(LOGGING)
 # Настройки Redis
 REDIS_HOST = settings.REDIS_HOST
 REDIS_PORT = settings.REDIS_PORT
+REDIS_MAX_CONNECTIONS = settings.REDIS_MAX_CONNECTIONS
+REDIS_POOL_TIMEOUT = settings.REDIS_POOL_TIMEOUT
 
 # Настройки Elasticsearch
 ELASTIC_HOST = settings.ELASTIC_HOST
@@ -36,6 +42,9 @@ ELASTIC_PORT = settings.ELASTIC_PORT
 ELASTIC_SCHEME_MOVIES = settings.ELASTIC_SCHEME_MOVIES
 ELASTIC_SCHEME_GENRES = settings.ELASTIC_SCHEME_GENRES
 ELASTIC_SCHEME_PERSONS = settings.ELASTIC_SCHEME_PERSONS
+ELASTIC_MAX_CONNECTIONS = settings.ELASTIC_MAX_CONNECTIONS
+ELASTIC_TIMEOUT = settings.ELASTIC_TIMEOUT
+ELASTIC_MAX_RESULT_WINDOW = settings.ELASTIC_MAX_RESULT_WINDOW
 
 # Корень проекта
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -1,9 +1,29 @@
-from typing import Optional
+from typing import Any, Optional
 
+import orjson
 from elasticsearch import AsyncElasticsearch
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.serializer import JSONSerializer
 
 es: Optional[AsyncElasticsearch] = None
 
+# Из ответа на поиск оставляем только найденные документы; при пустой выдаче ответ будет {}
+SEARCH_FILTER_PATH = ['hits.hits._source']
 
-async def get_elastic() -> AsyncElasticsearch:
-    return es
+
+class ORJSONSerializer(JSONSerializer):
+    """Serializer for the Elasticsearch client that works with json via orjson."""
+
+    def loads(self, s: str) -> Any:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError as error:
+            raise SerializationError(s, error)
+
+    def dumps(self, data: Any) -> str:
+        if isinstance(data, str):
+            return data
+        try:
+            return orjson.dumps(data, default=self.default).decode()
+        except TypeError as error:
+            raise SerializationError(data, error)
@@ -2,11 +2,12 @@ import uvicorn
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
 
 from src.api.v1 import films, genres, persons
 from src.core import config
 from src.db import elastic, redis
+from src.services import batcher, cache, film, genre, person
 
 app = FastAPI(
     title='API для Кинотеатра',
@@ -20,12 +21,40 @@ app = FastAPI(
 
 @app.on_event('startup')
 async def startup():
-    redis.redis = Redis(host=config.REDIS_HOST, port=config.REDIS_PORT)
-    elastic.es = AsyncElasticsearch(hosts=[f'{config.ELASTIC_HOST}:{config.ELASTIC_PORT}'])
+    # Блокирующий пул: при занятых соединениях запросы ждут свободное, а не падают с ошибкой
+    redis.redis = Redis(connection_pool=BlockingConnectionPool(
+        host=config.REDIS_HOST,
+        port=config.REDIS_PORT,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+        timeout=config.REDIS_POOL_TIMEOUT,
+    ))
+    elastic.es = AsyncElasticsearch(
+        hosts=[f'{config.ELASTIC_HOST}:{config.ELASTIC_PORT}'],
+        maxsize=config.ELASTIC_MAX_CONNECTIONS,
+        http_compress=True,
+        timeout=config.ELASTIC_TIMEOUT,
+        serializer=elastic.ORJSONSerializer(),
+    )
+    batcher.film_batcher = batcher.ElasticBatcher(elastic.es, config.ELASTIC_SCHEME_MOVIES, film.FILM_FIELDS)
+    batcher.genre_batcher = batcher.ElasticBatcher(elastic.es, config.ELASTIC_SCHEME_GENRES, genre.GENRE_FIELDS)
+    batcher.person_batcher = batcher.ElasticBatcher(elastic.es, config.ELASTIC_SCHEME_PERSONS, person.PERSON_FIELDS)
+    for elastic_batcher in (batcher.film_batcher, batcher.genre_batcher, batcher.person_batcher):
+        elastic_batcher.start()
+    film.film_service = film.FilmService(redis.redis, elastic.es)
+    film.films_service = film.FilmsService(redis.redis, elastic.es)
+    film.film_search_service = film.SearchService(redis.redis, elastic.es)
+    genre.genre_service = genre.GenreService(redis.redis, elastic.es)
+    genre.genres_service = genre.GenresService(redis.redis, elastic.es)
+    person.person_service = person.PersonService(redis.redis, elastic.es)
+    person.person_search_service = person.SearchPersonService(redis.redis, elastic.es)
+    person.person_film_search_service = person.SearchPersonFilmService(redis.redis, elastic.es)
 
 
 @app.on_event('shutdown')
 async def shutdown():
+    for elastic_batcher in (batcher.film_batcher, batcher.genre_batcher, batcher.person_batcher):
+        await elastic_batcher.stop()
+    await cache.wait_background_tasks()
     await redis.redis.close()
     await elastic.es.close()
 
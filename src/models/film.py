@@ -1,13 +1,8 @@
-from typing import Dict, List
+from typing import Dict, List, TypedDict
 
-import orjson
 from pydantic import BaseModel
 
 
-def orjson_dumps(v, *, default):
-    return orjson.dumps(v, default=default).decode()
-
-
 class Film(BaseModel):
     id: str
     title: str
@@ -18,7 +13,8 @@ class Film(BaseModel):
     actors: List[Dict[str, str]]
     writers: List[Dict[str, str]]
 
-    class Config:
-        # Заменяем стандартную работу с json на более быструю
-        json_loads = orjson.loads
-        json_dumps = orjson_dumps
+
+class FilmLite(TypedDict):
+    id: str
+    title: str
+    imdb_rating: float
@@ -1,19 +1,9 @@
 from typing import Dict, List, Union
 
-import orjson
 from pydantic import BaseModel
 
 
-def orjson_dumps(v, *, default):
-    return orjson.dumps(v, default=default).decode()
-
-
 class Person(BaseModel):
     id: str
     full_name: str
     films: List[Dict[str, Union[str, List[str]]]]
-
-    class Config:
-        # Заменяем стандартную работу с json на более быструю
-        json_loads = orjson.loads
-        json_dumps = orjson_dumps
@@ -0,0 +1,80 @@
+import asyncio
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+MAX_BATCH_SIZE = 64
+MAX_WAIT_IN_SECONDS = 0.005  # 5 миллисекунд
+
+Source = Dict[str, Any]
+Batch = List[Tuple[str, asyncio.Future]]
+
+
+class ElasticBatcher:
+    """Collects single-document lookups by id and resolves them with one mget request."""
+
+    def __init__(self, elastic: AsyncElasticsearch, index: str, source_includes: Optional[List[str]] = None,
+                 max_batch: int = MAX_BATCH_SIZE, max_wait: float = MAX_WAIT_IN_SECONDS):
+        self.elastic = elastic
+        self.index = index
+        self.source_includes = source_includes
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: asyncio.Queue[Tuple[str, asyncio.Future]] = asyncio.Queue()
+        self._requests: Set[asyncio.Future] = set()
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        await asyncio.gather(*self._requests, return_exceptions=True)
+
+    async def get(self, doc_id: str) -> Optional[Source]:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((doc_id, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self.max_batch - 1:
+                # Даём время накопиться другим запросам, пришедшим почти одновременно
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: Batch):
+        request = asyncio.ensure_future(
+            self.elastic.mget(index=self.index, body={'ids': [doc_id for doc_id, _ in batch]},
+                              _source_includes=self.source_includes),
+        )
+        self._requests.add(request)
+        request.add_done_callback(self._requests.discard)
+        request.add_done_callback(partial(self._resolve, batch))
+
+    @staticmethod
+    def _resolve(batch: Batch, request: asyncio.Future):
+        pending = [(doc_id, future) for doc_id, future in batch if not future.done()]
+        if request.cancelled():
+            for _, future in pending:
+                future.cancel()
+            return
+        error = request.exception()
+        if error:
+            for _, future in pending:
+                future.set_exception(error)
+            return
+        sources = {doc['_id']: doc['_source'] for doc in request.result()['docs'] if doc.get('found')}
+        for doc_id, future in pending:
+            future.set_result(sources.get(doc_id))
+
+
+film_batcher: Optional[ElasticBatcher] = None
+genre_batcher: Optional[ElasticBatcher] = None
+person_batcher: Optional[ElasticBatcher] = None
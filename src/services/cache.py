@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+import orjson
+import xxhash
+import zstandard
+from pydantic import BaseModel
+from redis.asyncio.client import Pipeline
+
+logger = logging.getLogger(__name__)
+
+# Версия схемы ключей: её увеличение сразу делает недоступными записи в старом формате
+CACHE_KEY_VERSION = b'v1:'
+
+LOCAL_CACHE_MAX_SIZE = 10_000
+LOCAL_CACHE_EXPIRE_IN_SECONDS = 30
+
+# Первый байт сохранённого значения — версия формата, чтобы его можно было сменить
+ZSTD_FORMAT = b'\x01'
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора до завершения
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def make_key(prefix: bytes, *parts: Any) -> bytes:
+    """Build a Redis key: a short readable prefix, the key schema version and a 128-bit hash of the parts.
+
+    The parts are encoded as a JSON array, so None and the string 'None' produce different keys.
+    """
+    return prefix + CACHE_KEY_VERSION + xxhash.xxh3_128_digest(orjson.dumps(parts))
+
+
+def encode_model(obj: Any) -> Dict[str, Any]:
+    """orjson default hook that serializes pydantic models straight from their attributes."""
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    raise TypeError(f'Type is not JSON serializable: {type(obj).__name__}')
+
+
+def compress(data: bytes) -> bytes:
+    """Pack a payload for storing in Redis."""
+    return ZSTD_FORMAT + _compressor.compress(data)
+
+
+def decompress(data: Optional[bytes]) -> Optional[bytes]:
+    """Unpack a payload read from Redis; values in an unknown format are treated as a cache miss."""
+    if not data or data[:1] != ZSTD_FORMAT:
+        return None
+    return _decompressor.decompress(data[1:])
+
+
+def execute_in_background(pipeline: Pipeline):
+    """Send a Redis pipeline without waiting for the reply, so the current request does not pay for the writes."""
+    task = asyncio.create_task(pipeline.execute())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(_log_background_error)
+
+
+def _log_background_error(task: asyncio.Task):
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error:
+        logger.error('Background cache write failed', exc_info=error)
+
+
+async def wait_background_tasks():
+    """Wait for background cache writes that are still running."""
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
@@ -1,17 +1,21 @@
-from functools import lru_cache
 from typing import Dict, List, Optional, TypedDict, Union
 
 import orjson
+from cachetools import TTLCache
 from elasticsearch import AsyncElasticsearch, NotFoundError
-from fastapi import Depends
 from redis.asyncio import Redis
 
 from src.core import config
-from src.db.elastic import get_elastic
-from src.db.redis import get_redis
-from src.models.film import Film
+from src.db.elastic import SEARCH_FILTER_PATH
+from src.models.film import Film, FilmLite
+from src.services import batcher
+from src.services.batcher import Source
+from src.services.cache import LOCAL_CACHE_EXPIRE_IN_SECONDS, LOCAL_CACHE_MAX_SIZE, compress, decompress, make_key
+from src.services.singleflight import SingleFlight
 
 FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
+FILM_FIELDS = list(Film.model_fields)
+FILM_LITE_FIELDS = ['id', 'title', 'imdb_rating']
 
 
 class FilterQuery(TypedDict):
@@ -26,40 +30,49 @@ class FilmService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
-
-    async def get_by_id(self, film_id: str) -> Optional[Film]:
-        film = await self._get_film_from_cache(film_id)
-        if not film:
-            film = await self._get_film_from_elastic(film_id)
-            if not film:
+        self._inflight = SingleFlight()
+        self._local = TTLCache(maxsize=LOCAL_CACHE_MAX_SIZE, ttl=LOCAL_CACHE_EXPIRE_IN_SECONDS)
+
+    async def get_by_id(self, film_id: str) -> Optional[bytes]:
+        data = self._local.get(film_id)
+        if data:
+            return data
+        data = await self._get_film_from_cache(film_id)
+        if not data:
+            data = await self._inflight.do(film_id, lambda: self._load_film(film_id))
+            if not data:
                 return None
-            await self._put_film_to_cache(film)
-        return film
+        self._local[film_id] = data
+        return data
 
-    async def _get_film_from_elastic(self, film_id: str) -> Optional[Film]:
+    async def _load_film(self, film_id: str) -> Optional[bytes]:
+        source = await self._get_film_from_elastic(film_id)
+        if not source:
+            return None
+        data = orjson.dumps(source)
+        await self._put_film_to_cache(film_id, data)
+        return data
+
+    async def _get_film_from_elastic(self, film_id: str) -> Optional[Source]:
         try:
-            doc = await self.elastic.get(index=config.ELASTIC_SCHEME_MOVIES, id=film_id)
+            return await batcher.film_batcher.get(film_id)
         except NotFoundError:
             return None
-        return Film(**doc['_source'])
 
-    async def _get_film_from_cache(self, film_id: str) -> Optional[Film]:
-        data = await self.redis.get(film_id)
-        if not data:
-            return None
-        film = Film.parse_raw(data)
-        return film
+    async def _get_film_from_cache(self, film_id: str) -> Optional[bytes]:
+        return await self.redis.get(make_key(b'film:', film_id))
 
-    async def _put_film_to_cache(self, film: Film):
-        await self.redis.set(film.id, film.json(), FILM_CACHE_EXPIRE_IN_SECONDS)
+    async def _put_film_to_cache(self, film_id: str, data: bytes):
+        await self.redis.set(make_key(b'film:', film_id), data, FILM_CACHE_EXPIRE_IN_SECONDS)
 
 
 class FilmsService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self._inflight = SingleFlight()
 
-    async def get_films(self, page_size: int, page_number: int, genre_name: Optional[str]) -> Optional[List[Film]]:
+    async def get_films(self, page_size: int, page_number: int, genre_name: Optional[str]) -> Optional[bytes]:
         sort_list = [
             {'imdb_rating': 'desc'},
         ]
@@ -73,44 +86,55 @@ class FilmsService:
             }
         else:
             filter = None
-        films = await self._get_films_from_cache(genre_name, page_size, page_number)
-        if not films:
-            films = await self._get_films_from_elastic(sort_list, page_size, page_number, filter)
-            if not films:
-                return None
-            await self._put_films_to_cache(films, page_size, page_number, genre_name)
-        return films
+        data = await self._get_films_from_cache(genre_name, page_size, page_number)
+        if not data:
+            data = await self._inflight.do(
+                (page_size, page_number, genre_name),
+                lambda: self._load_films(sort_list, page_size, page_number, genre_name, filter),
+            )
+        return data
+
+    async def _load_films(self, sort: List[Dict[str, str]], page_size: int, page_number: int,
+                          genre_name: Optional[str], filter: Optional[FilterQuery]) -> Optional[bytes]:
+        films = await self._get_films_from_elastic(sort, page_size, page_number, filter)
+        if films is None:
+            return None
+        data = orjson.dumps(films)
+        await self._put_films_to_cache(data, page_size, page_number, genre_name)
+        return data
 
     async def _get_films_from_elastic(self, sort: List[Dict[str, str]], page_size: int, page_number: int,
-                                      filter: Optional[FilterQuery]) -> Optional[List[Film]]:
+                                      filter: Optional[FilterQuery]) -> Optional[List[FilmLite]]:
         try:
             if filter:
                 docs = await self.elastic.search(index=config.ELASTIC_SCHEME_MOVIES, sort=sort, query=filter,
-                                                 from_=page_size * (page_number - 1), size=page_size)
+                                                 from_=page_size * (page_number - 1), size=page_size,
+                                                 _source_includes=FILM_LITE_FIELDS,
+                                                 track_total_hits=False, filter_path=SEARCH_FILTER_PATH)
             else:
                 docs = await self.elastic.search(index=config.ELASTIC_SCHEME_MOVIES, sort=sort,
-                                                 from_=page_size * (page_number - 1), size=page_size)
+                                                 from_=page_size * (page_number - 1), size=page_size,
+                                                 _source_includes=FILM_LITE_FIELDS,
+                                                 track_total_hits=False, filter_path=SEARCH_FILTER_PATH)
         except NotFoundError:
             return None
-        return [Film(**film['_source']) for film in docs['hits']['hits']]
+        return [film['_source'] for film in docs.get('hits', {}).get('hits', [])]
 
-    async def _get_films_from_cache(self, genre_name: str, page_size: int, page_number: int) -> Optional[List[Film]]:
-        data = await self.redis.get(f'{page_size}-{page_number}-{genre_name}')
-        if not data:
-            return None
-        return [Film(**film) for film in orjson.loads(data)]
+    async def _get_films_from_cache(self, genre_name: str, page_size: int, page_number: int) -> Optional[bytes]:
+        return decompress(await self.redis.get(make_key(b'fl:', page_size, page_number, genre_name)))
 
-    async def _put_films_to_cache(self, films: List[Film], page_size: int, page_number: int, genre_name: str):
-        await self.redis.set(f'{page_size}-{page_number}-{genre_name}',
-                             orjson.dumps([film.dict() for film in films]), FILM_CACHE_EXPIRE_IN_SECONDS)
+    async def _put_films_to_cache(self, data: bytes, page_size: int, page_number: int, genre_name: str):
+        await self.redis.set(make_key(b'fl:', page_size, page_number, genre_name), compress(data),
+                             FILM_CACHE_EXPIRE_IN_SECONDS)
 
 
 class SearchService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self._inflight = SingleFlight()
 
-    async def search_film(self, query: str, page_size: int, page_number: int) -> Optional[List[Film]]:
+    async def search_film(self, query: str, page_size: int, page_number: int) -> Optional[bytes]:
         query_search = {
             'bool': {
                 'should': [
@@ -119,53 +143,54 @@ class SearchService:
                 ],
             },
         }
-        films = await self._get_film_from_cache(query, page_size, page_number)
-        if not films:
-            films = await self._search_film_from_elastic(query_search, page_size, page_number)
-            if not films:
-                return None
-            await self._put_search_film_to_cache(films, query, page_size, page_number)
-        return films
+        data = await self._get_film_from_cache(query, page_size, page_number)
+        if not data:
+            data = await self._inflight.do(
+                (query, page_size, page_number),
+                lambda: self._load_search_film(query_search, query, page_size, page_number),
+            )
+        return data
+
+    async def _load_search_film(self, query_s: FilmQuery, query: str,
+                                page_size: int, page_number: int) -> Optional[bytes]:
+        films = await self._search_film_from_elastic(query_s, page_size, page_number)
+        if films is None:
+            return None
+        data = orjson.dumps(films)
+        await self._put_search_film_to_cache(data, query, page_size, page_number)
+        return data
 
     async def _search_film_from_elastic(self, query_s: FilmQuery,
-                                        page_size: int, page_number: int) -> Optional[List[Film]]:
+                                        page_size: int, page_number: int) -> Optional[List[FilmLite]]:
         try:
             docs = await self.elastic.search(index=config.ELASTIC_SCHEME_MOVIES, query=query_s,
-                                             from_=page_size * (page_number - 1), size=page_size)
+                                             from_=page_size * (page_number - 1), size=page_size,
+                                             _source_includes=FILM_LITE_FIELDS,
+                                             track_total_hits=False, filter_path=SEARCH_FILTER_PATH)
         except NotFoundError:
             return None
-        return [Film(**film['_source']) for film in docs['hits']['hits']]
+        return [film['_source'] for film in docs.get('hits', {}).get('hits', [])]
+
+    async def _get_film_from_cache(self, query: str, page_size: int, page_number: int) -> Optional[bytes]:
+        return decompress(await self.redis.get(make_key(b'fs:', query, page_size, page_number)))
+
+    async def _put_search_film_to_cache(self, data: bytes, query: str, page_size: int, page_number: int):
+        await self.redis.set(make_key(b'fs:', query, page_size, page_number), compress(data),
+                             FILM_CACHE_EXPIRE_IN_SECONDS)
 
-    async def _get_film_from_cache(self, query: str, page_size: int, page_number: int) -> Optional[List[Film]]:
-        data = await self.redis.get(f'{query}-{page_size}-{page_number}')
-        if not data:
-            return None
-        return [Film(**film) for film in orjson.loads(data)]
 
-    async def _put_search_film_to_cache(self, films: List[Film], query: str, page_size: int, page_number: int):
-        await self.redis.set(f'{query}-{page_size}-{page_number}',
-                             orjson.dumps([film.dict() for film in films]), FILM_CACHE_EXPIRE_IN_SECONDS)
+film_service: Optional[FilmService] = None
+films_service: Optional[FilmsService] = None
+film_search_service: Optional[SearchService] = None
 
 
-@lru_cache()
-def get_film_service(
-        redis: Redis = Depends(get_redis),
-        elastic: AsyncElasticsearch = Depends(get_elastic),
-) -> FilmService:
-    return FilmService(redis, elastic)
+async def get_film_service() -> FilmService:
+    return film_service
 
 
-@lru_cache()
-def get_films_service(
-        redis: Redis = Depends(get_redis),
-        elastic: AsyncElasticsearch = Depends(get_elastic),
-) -> FilmsService:
-    return FilmsService(redis, elastic)
+async def get_films_service() -> FilmsService:
+    return films_service
 
 
-@lru_cache()
-def search_film_service(
-        redis: Redis = Depends(get_redis),
-        elastic: AsyncElasticsearch = Depends(get_elastic),
-) -> SearchService:
-    return SearchService(redis, elastic)
+async def search_film_service() -> SearchService:
+    return film_search_service
@@ -1,95 +1,114 @@
-from functools import lru_cache
 from typing import List, Optional
 
 import orjson
+from cachetools import TTLCache
 from elasticsearch import AsyncElasticsearch, NotFoundError
-from fastapi import Depends
 from redis.asyncio import Redis
 
 from src.core import config
-from src.db.elastic import get_elastic
-from src.db.redis import get_redis
+from src.db.elastic import SEARCH_FILTER_PATH
 from src.models.genre import Genre
+from src.services import batcher
+from src.services.batcher import Source
+from src.services.cache import (LOCAL_CACHE_EXPIRE_IN_SECONDS, LOCAL_CACHE_MAX_SIZE, compress, decompress,
+                                encode_model, execute_in_background, make_key)
+from src.services.singleflight import SingleFlight
 
 GENRE_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
+GENRE_FIELDS = list(Genre.model_fields)
 
 
 class GenreService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
-
-    async def get_by_id(self, genre_id: str) -> Optional[Genre]:
-        genre = await self._get_genre_from_cache(genre_id)
-        if not genre:
-            genre = await self._get_genre_from_elastic(genre_id)
-            if not genre:
+        self._inflight = SingleFlight()
+        self._local = TTLCache(maxsize=LOCAL_CACHE_MAX_SIZE, ttl=LOCAL_CACHE_EXPIRE_IN_SECONDS)
+
+    async def get_by_id(self, genre_id: str) -> Optional[bytes]:
+        data = self._local.get(genre_id)
+        if data:
+            return data
+        data = await self._get_genre_from_cache(genre_id)
+        if not data:
+            data = await self._inflight.do(genre_id, lambda: self._load_genre(genre_id))
+            if not data:
                 return None
-            await self._put_genre_to_cache(genre)
-        return genre
+        self._local[genre_id] = data
+        return data
+
+    async def _load_genre(self, genre_id: str) -> Optional[bytes]:
+        source = await self._get_genre_from_elastic(genre_id)
+        if not source:
+            return None
+        data = orjson.dumps(source)
+        await self._put_genre_to_cache(genre_id, data)
+        return data
 
-    async def _get_genre_from_elastic(self, genre_id: str) -> Optional[Genre]:
+    async def _get_genre_from_elastic(self, genre_id: str) -> Optional[Source]:
         try:
-            doc = await self.elastic.get(index=config.ELASTIC_SCHEME_GENRES, id=genre_id)
+            return await batcher.genre_batcher.get(genre_id)
         except NotFoundError:
             return None
-        return Genre(**doc['_source'])
 
-    async def _get_genre_from_cache(self, genre_id: str) -> Optional[Genre]:
-        data = await self.redis.get(genre_id)
-        if not data:
-            return None
-        genre = Genre.parse_raw(data)
-        return genre
+    async def _get_genre_from_cache(self, genre_id: str) -> Optional[bytes]:
+        return await self.redis.get(make_key(b'genre:', genre_id))
 
-    async def _put_genre_to_cache(self, genre: Genre):
-        await self.redis.set(genre.id, genre.json(), GENRE_CACHE_EXPIRE_IN_SECONDS)
+    async def _put_genre_to_cache(self, genre_id: str, data: bytes):
+        await self.redis.set(make_key(b'genre:', genre_id), data, GENRE_CACHE_EXPIRE_IN_SECONDS)
 
 
 class GenresService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self._inflight = SingleFlight()
 
-    async def get_genres(self, page_size: int, page_number: int) -> Optional[List[Genre]]:
-        genres = await self._get_genres_from_cache(page_size, page_number)
-        if not genres:
-            genres = await self._get_genres_from_elastic(page_size, page_number)
-            if not genres:
-                return None
-            await self._put_genres_to_cache(genres, page_size, page_number)
-        return genres
+    async def get_genres(self, page_size: int, page_number: int) -> Optional[bytes]:
+        data = await self._get_genres_from_cache(page_size, page_number)
+        if not data:
+            data = await self._inflight.do(
+                (page_size, page_number),
+                lambda: self._load_genres(page_size, page_number),
+            )
+        return data
+
+    async def _load_genres(self, page_size: int, page_number: int) -> Optional[bytes]:
+        genres = await self._get_genres_from_elastic(page_size, page_number)
+        if genres is None:
+            return None
+        data = orjson.dumps(genres, default=encode_model)
+        await self._put_genres_to_cache(data, genres, page_size, page_number)
+        return data
 
     async def _get_genres_from_elastic(self, page_size: int, page_number: int) -> Optional[List[Genre]]:
         try:
             docs = await self.elastic.search(index=config.ELASTIC_SCHEME_GENRES,
-                                             from_=page_size * (page_number - 1), size=page_size)
+                                             from_=page_size * (page_number - 1), size=page_size,
+                                             _source_includes=GENRE_FIELDS,
+                                             track_total_hits=False, filter_path=SEARCH_FILTER_PATH)
         except NotFoundError:
             return None
-        return [Genre(**genre['_source']) for genre in docs['hits']['hits']]
+        return [Genre(**genre['_source']) for genre in docs.get('hits', {}).get('hits', [])]
+
+    async def _get_genres_from_cache(self, page_size: int, page_number: int) -> Optional[bytes]:
+        return decompress(await self.redis.get(make_key(b'gl:', page_size, page_number)))
+
+    async def _put_genres_to_cache(self, data: bytes, genres: List[Genre], page_size: int, page_number: int):
+        await self.redis.set(make_key(b'gl:', page_size, page_number), compress(data), GENRE_CACHE_EXPIRE_IN_SECONDS)
+        pipe = self.redis.pipeline(transaction=False)
+        for genre in genres:
+            pipe.set(make_key(b'genre:', genre.id), genre.model_dump_json(), GENRE_CACHE_EXPIRE_IN_SECONDS)
+        execute_in_background(pipe)
 
-    async def _get_genres_from_cache(self, page_size: int, page_number: int) -> Optional[List[Genre]]:
-        data = await self.redis.get(f'{page_size}-{page_number}')
-        if not data:
-            return None
-        return [Genre(**genre) for genre in orjson.loads(data)]
 
-    async def _put_genres_to_cache(self, genres: List[Genre], page_size: int, page_number: int):
-        await self.redis.set(f'{page_size}-{page_number}',
-                             orjson.dumps([genre.dict() for genre in genres]), GENRE_CACHE_EXPIRE_IN_SECONDS)
+genre_service: Optional[GenreService] = None
+genres_service: Optional[GenresService] = None
 
 
-@lru_cache()
-def get_genre_service(
-        redis: Redis = Depends(get_redis),
-        elastic: AsyncElasticsearch = Depends(get_elastic),
-) -> GenreService:
-    return GenreService(redis, elastic)
+async def get_genre_service() -> GenreService:
+    return genre_service
 
 
-@lru_cache()
-def get_genres_service(
-        redis: Redis = Depends(get_redis),
-        elastic: AsyncElasticsearch = Depends(get_elastic),
-) -> GenresService:
-    return GenresService(redis, elastic)
+async def get_genres_service() -> GenresService:
+    return genres_service
@@ -1,18 +1,32 @@
-from functools import lru_cache
 from typing import Dict, List, Optional, TypedDict, Union
 
 import orjson
+from cachetools import TTLCache
 from elasticsearch import AsyncElasticsearch, NotFoundError
-from fastapi import Depends
 from redis.asyncio import Redis
 
 from src.core import config
-from src.db.elastic import get_elastic
-from src.db.redis import get_redis
-from src.models.film import Film
+from src.db.elastic import SEARCH_FILTER_PATH
+from src.models.film import FilmLite
 from src.models.person import Person
+from src.services import batcher
+from src.services.batcher import Source
+from src.services.cache import (LOCAL_CACHE_EXPIRE_IN_SECONDS, LOCAL_CACHE_MAX_SIZE, compress, decompress,
+                                execute_in_background, make_key)
+from src.services.film import FILM_LITE_FIELDS
+from src.services.singleflight import SingleFlight
 
 PERSON_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
+PERSON_FIELDS = ['id', 'full_name', 'films.id', 'films.roles']
+
+
+def person_short(person: Person) -> Dict[str, Union[str, List[Dict[str, Union[str, List[str]]]]]]:
+    """Convert a person into the form returned by the person endpoints."""
+    return {
+        'id': person.id,
+        'full_name': person.full_name,
+        'films': [{'id': film['id'], 'roles': film['roles']} for film in person.films],
+    }
 
 
 class PersonQuery(TypedDict):
@@ -27,40 +41,49 @@ class PersonService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
-
-    async def get_by_id(self, person_id: str) -> Optional[Person]:
-        person = await self._person_from_cache(person_id)
-        if not person:
-            person = await self._get_person_from_elastic(person_id)
-            if not person:
+        self._inflight = SingleFlight()
+        self._local = TTLCache(maxsize=LOCAL_CACHE_MAX_SIZE, ttl=LOCAL_CACHE_EXPIRE_IN_SECONDS)
+
+    async def get_by_id(self, person_id: str) -> Optional[bytes]:
+        data = self._local.get(person_id)
+        if data:
+            return data
+        data = await self._get_person_from_cache(person_id)
+        if not data:
+            data = await self._inflight.do(person_id, lambda: self._load_person(person_id))
+            if not data:
                 return None
-            await self._put_person_to_cache(person)
-        return person
+        self._local[person_id] = data
+        return data
+
+    async def _load_person(self, person_id: str) -> Optional[bytes]:
+        source = await self._get_person_from_elastic(person_id)
+        if not source:
+            return None
+        data = orjson.dumps(source)
+        await self._put_person_to_cache(person_id, data)
+        return data
 
-    async def _get_person_from_elastic(self, person_id: str) -> Optional[Person]:
+    async def _get_person_from_elastic(self, person_id: str) -> Optional[Source]:
         try:
-            doc = await self.elastic.get(index=config.ELASTIC_SCHEME_PERSONS, id=person_id)
+            return await batcher.person_batcher.get(person_id)
         except NotFoundError:
             return None
-        return Person(**doc['_source'])
 
-    async def _get_person_from_cache(self, person_id: str) -> Optional[Person]:
-        data = await self.redis.get(person_id)
-        if not data:
-            return None
-        person = Person.parse_raw(data)
-        return person
+    async def _get_person_from_cache(self, person_id: str) -> Optional[bytes]:
+        return await self.redis.get(make_key(b'person:', person_id))
 
-    async def _put_person_to_cache(self, person: Person):
-        await self.redis.set(person.id, person.json(), PERSON_CACHE_EXPIRE_IN_SECONDS)
+    async def _put_person_to_cache(self, person_id: str, data: bytes):
+        await self.redis.set(make_key(b'person:', person_id), data, PERSON_CACHE_EXPIRE_IN_SECONDS)
 
 
 class SearchPersonService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self._inflight = SingleFlight()
 
-    async def search_persons(self, query: str, page_size: int, page_number: int) -> Optional[Person]:
+    async def search_persons(self, query: str, page_size: int, page_number: int) -> Optional[bytes]:
         query_search = {
             'match': {
                 'full_name': {
@@ -69,40 +92,54 @@ class SearchPersonService:
                 },
             },
         }
-        persons = await self._get_persons_from_cache(query, page_size, page_number)
-        if not persons:
-            persons = await self._search_persons_from_elastic(query_search, page_size, page_number)
-            if not persons:
-                return None
-            await self._put_persons_to_cache(persons, query, page_size, page_number)
-        return persons
+        data = await self._get_persons_from_cache(query, page_size, page_number)
+        if not data:
+            data = await self._inflight.do(
+                (query, page_size, page_number),
+                lambda: self._load_persons(query_search, query, page_size, page_number),
+            )
+        return data
+
+    async def _load_persons(self, query_s: PersonQuery, query: str,
+                            page_size: int, page_number: int) -> Optional[bytes]:
+        persons = await self._search_persons_from_elastic(query_s, page_size, page_number)
+        if persons is None:
+            return None
+        data = orjson.dumps([person_short(person) for person in persons])
+        await self._put_persons_to_cache(data, persons, query, page_size, page_number)
+        return data
 
     async def _search_persons_from_elastic(self, query_s: PersonQuery,
                                            page_size: int, page_number: int) -> Optional[List[Person]]:
         try:
             docs = await self.elastic.search(index=config.ELASTIC_SCHEME_PERSONS, query=query_s,
-                                             from_=page_size * (page_number - 1), size=page_size)
+                                             from_=page_size * (page_number - 1), size=page_size,
+                                             track_total_hits=False, filter_path=SEARCH_FILTER_PATH)
         except NotFoundError:
             return None
-        return [Person(**person['_source']) for person in docs['hits']['hits']]
+        return [Person(**person['_source']) for person in docs.get('hits', {}).get('hits', [])]
 
-    async def _get_persons_from_cache(self, query: str, page_size: int, page_number: int) -> Optional[List[Person]]:
-        data = await self.redis.get(f'{query}-{page_size}-{page_number}')
-        if not data:
-            return None
-        return [Person(**person) for person in orjson.loads(data)]
+    async def _get_persons_from_cache(self, query: str, page_size: int, page_number: int) -> Optional[bytes]:
+        return decompress(await self.redis.get(make_key(b'ps:', query, page_size, page_number)))
 
-    async def _put_persons_to_cache(self, persons: List[Person], query: str, page_size: int, page_number: int):
-        await self.redis.set(f'{query}-{page_size}-{page_number}',
-                             orjson.dumps([person.dict() for person in persons]), PERSON_CACHE_EXPIRE_IN_SECONDS)
+    async def _put_persons_to_cache(self, data: bytes, persons: List[Person],
+                                    query: str, page_size: int, page_number: int):
+        await self.redis.set(make_key(b'ps:', query, page_size, page_number), compress(data),
+                             PERSON_CACHE_EXPIRE_IN_SECONDS)
+        pipe = self.redis.pipeline(transaction=False)
+        for person in persons:
+            pipe.set(make_key(b'person:', person.id), orjson.dumps(person_short(person)),
+                     PERSON_CACHE_EXPIRE_IN_SECONDS)
+        execute_in_background(pipe)
 
 
 class SearchPersonFilmService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self._inflight = SingleFlight()
 
-    async def search_film(self, person_id: str, page_size: int, page_number: int) -> Optional[List[Film]]:
+    async def search_film(self, person_id: str, page_size: int, page_number: int) -> Optional[bytes]:
         query_search = {
             'nested': {
                 'path': 'actors',
@@ -113,55 +150,56 @@ class SearchPersonFilmService:
                 },
             },
         }
-        films = await self._get_person_film_from_cache(person_id, page_size, page_number)
-        if not films:
-            films = await self._search_person_from_elastic(query_search, page_size, page_number)
-            if not films:
-                return None
-            await self._put_search_person_film_to_cache(films, person_id, page_size, page_number)
-        return films
+        data = await self._get_person_film_from_cache(person_id, page_size, page_number)
+        if not data:
+            data = await self._inflight.do(
+                (person_id, page_size, page_number),
+                lambda: self._load_person_film(query_search, person_id, page_size, page_number),
+            )
+        return data
+
+    async def _load_person_film(self, query_s: FilmQuery, person_id: str,
+                                page_size: int, page_number: int) -> Optional[bytes]:
+        films = await self._search_person_from_elastic(query_s, page_size, page_number)
+        if films is None:
+            return None
+        data = orjson.dumps(films)
+        await self._put_search_person_film_to_cache(data, person_id, page_size, page_number)
+        return data
 
     async def _search_person_from_elastic(self, query_s: FilmQuery,
-                                          page_size: int, page_number: int) -> Optional[List[Film]]:
+                                          page_size: int, page_number: int) -> Optional[List[FilmLite]]:
         try:
             docs = await self.elastic.search(index=config.ELASTIC_SCHEME_MOVIES, query=query_s,
-                                             from_=page_size * (page_number - 1), size=page_size)
+                                             from_=page_size * (page_number - 1), size=page_size,
+                                             _source_includes=FILM_LITE_FIELDS,
+                                             track_total_hits=False, filter_path=SEARCH_FILTER_PATH)
         except NotFoundError:
             return None
-        return [Film(**film['_source']) for film in docs['hits']['hits']]
+        return [film['_source'] for film in docs.get('hits', {}).get('hits', [])]
 
     async def _get_person_film_from_cache(self, person_id: str,
-                                          page_size: int, page_number: int) -> Optional[List[Film]]:
-        data = await self.redis.get(f'{person_id}-{page_size}-{page_number}')
-        if not data:
-            return None
-        return [Film(**film) for film in orjson.loads(data)]
+                                          page_size: int, page_number: int) -> Optional[bytes]:
+        return decompress(await self.redis.get(make_key(b'pf:', person_id, page_size, page_number)))
 
-    async def _put_search_person_film_to_cache(self, films: List[Film],
+    async def _put_search_person_film_to_cache(self, data: bytes,
                                                person_id: str, page_size: int, page_number: int):
-        await self.redis.set(f'{person_id}-{page_size}-{page_number}',
-                             orjson.dumps([film.dict() for film in films]), PERSON_CACHE_EXPIRE_IN_SECONDS)
+        await self.redis.set(make_key(b'pf:', person_id, page_size, page_number), compress(data),
+                             PERSON_CACHE_EXPIRE_IN_SECONDS)
+
+
+person_service: Optional[PersonService] = None
+person_search_service: Optional[SearchPersonService] = None
+person_film_search_service: Optional[SearchPersonFilmService] = None
 
 
-@lru_cache()
-def get_person_service(
-        redis: Redis = Depends(get_redis),
-        elastic: AsyncElasticsearch = Depends(get_elastic),
-) -> PersonService:
-    return PersonService(redis, elastic)
+async def get_person_service() -> PersonService:
+    return person_service
 
 
-@lru_cache()
-def search_person_service(
-        redis: Redis = Depends(get_redis),
-        elastic: AsyncElasticsearch = Depends(get_elastic),
-) -> SearchPersonService:
-    return SearchPersonService(redis, elastic)
+async def search_person_service() -> SearchPersonService:
+    return person_search_service
 
 
-@lru_cache()
-def search_person_films_service(
-        redis: Redis = Depends(get_redis),
-        elastic: AsyncElasticsearch = Depends(get_elastic),
-) -> SearchPersonFilmService:
-    return SearchPersonFilmService(redis, elastic)
+async def search_person_films_service() -> SearchPersonFilmService:
+    return person_film_search_service